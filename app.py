@@ -1,18 +1,106 @@
 # --------------------------- 1. Imports ---------------------------
+import os
+import re
 import streamlit as st
+import numpy as np
 import pandas as pd
+import pyarrow.json
 import io
-from reportlab.lib.pagesizes import A3
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib import colors
-from textwrap import wrap
+
+# reportlab and gtts are deliberately not imported here: they only load
+# inside the PDF / audio handlers so cold reruns skip their import cost.
 
 # --------------------------- 2. Load Dataset ---------------------------
-df = pd.read_json("cleaned_data.jsonl", lines=True)
+_NONALPHA = re.compile(r"[^A-Z ]")
+
+# Activity options live up here because load_data packs each row's codes
+# into a bitmask keyed by this list's order.
+activities = [
+    "S Sitting", "ST Standing", "W Walking", "BN Bending", "L Lifting",
+    "PP Pulling & Pushing", "KC Kneeling & Crouching",
+    "MF Manipulation with Fingers", "RW Reading & Writing",
+    "SE Seeing", "H Hearing", "C Communication"
+]
+
+# ---- Code → activity lookup, built once for O(1) token resolution ----
+TOKEN2ACT = {a.split()[0].upper(): a for a in activities}
+TOKEN_CODES = np.array(list(TOKEN2ACT))
+ACT_BIT = {code: 1 << i for i, code in enumerate(TOKEN2ACT)}
+
+# cache_resource shares one read-only DataFrame across reruns and sessions
+# without the per-hit deep copy st.cache_data would make.
+@st.cache_resource(show_spinner=False)
+def load_data(path, mtime):
+    # mtime only serves as a cache key so dataset updates invalidate the entry
+
+    # A Parquet sidecar holds the fully prepared frame (normalized columns,
+    # categoricals); cold starts after the first skip JSON parsing entirely.
+    parquet_path = os.path.splitext(path)[0] + ".parquet"
+    if os.path.exists(parquet_path) and os.path.getmtime(parquet_path) >= mtime:
+        return pd.read_parquet(parquet_path)
+
+    table = pyarrow.json.read_json(
+        path, read_options=pyarrow.json.ReadOptions(block_size=8 << 20)
+    )
+    df = table.to_pandas()
+    df = df.convert_dtypes(dtype_backend="pyarrow")
+
+    # ---- Strip stray whitespace from every string column, vectorized ----
+    str_cols = [c for c in df.columns if pd.api.types.is_string_dtype(df[c])]
+    df[str_cols] = df[str_cols].apply(lambda s: s.str.strip())
+
+    # ---- REMOVE TIMESTAMP / DATE COLUMNS GLOBALLY ----
+    df = df.loc[:, ~df.columns.str.contains("time|date", case=False)]
+
+    # ---- Concatenate the disability columns once for single-pass search ----
+    dis_cols = [c for c in df.columns if "disabilities" in c.lower()]
+    if dis_cols:
+        df["_disability_text"] = (
+            df[dis_cols].fillna("").astype(str).agg(" ".join, axis=1).str.lower()
+        )
 
-# ---- REMOVE TIMESTAMP / DATE COLUMNS GLOBALLY ----
-df = df.loc[:, ~df.columns.str.contains("time|date", case=False)]
+    # ---- Normalized activity codes, computed once instead of per query ----
+    if "functional_requirements" in df.columns:
+        df["_fr_codes"] = (
+            df["functional_requirements"]
+            .fillna("")
+            .astype(str)
+            .str.upper()
+            .str.replace(_NONALPHA, "", regex=True)
+        )
+
+    # ---- Pack each row's activity codes into one uint16 bitmask ----
+    if "_fr_codes" in df.columns:
+        bits = np.zeros(len(df), dtype=np.uint16)
+        for code, bit in ACT_BIT.items():
+            hit = df["_fr_codes"].str.contains(code, regex=False, na=False)
+            bits[hit.to_numpy(dtype=bool)] |= np.uint16(bit)
+        df["_act_mask"] = bits
+
+    # ---- Canonical group letter ("a (one level)" / "Group A" → "A") ----
+    if "group" in df.columns:
+        df["_group_norm"] = (
+            df["group"]
+            .astype(str)
+            .str.extract(r"(?i)\b(?:group\s*)?([a-d])\b", expand=False)
+            .str.upper()
+        )
+
+    # ---- Lowercased department for case-insensitive search without a
+    # ---- per-query full-column lowercase pass ----
+    if "department" in df.columns:
+        df["_dept_lower"] = df["department"].astype(str).str.lower()
+
+    # ---- Low-cardinality strings → category (int codes + small dictionary) ----
+    for col in ("department", "group", "_group_norm", "qualification_required", "subcategory"):
+        if col in df.columns:
+            df[col] = df[col].astype("category")
+
+    df.to_parquet(parquet_path)
+    return df
+
+DATA_FILE = "cleaned_data.jsonl"
+df = load_data(DATA_FILE, os.path.getmtime(DATA_FILE))
 
 if df.empty:
     st.stop()
@@ -50,23 +138,20 @@ qualifications = [
     "Graduate", "Post Graduate", "Doctorate"
 ]
 
-# ---- Capitalize department names ----
-departments = (
-    df["department"]
-    .dropna()
-    .astype(str)
-    .str.title()
-    .unique()
-    .tolist()
-    if "department" in df.columns else []
-)
-
-activities = [
-    "S Sitting", "ST Standing", "W Walking", "BN Bending", "L Lifting",
-    "PP Pulling & Pushing", "KC Kneeling & Crouching",
-    "MF Manipulation with Fingers", "RW Reading & Writing",
-    "SE Seeing", "H Hearing", "C Communication"
-]
+# ---- Dataset-derived metadata, computed once instead of per rerun ----
+@st.cache_data(show_spinner=False)
+def dataset_meta(df):
+    return {
+        "departments": (
+            df["department"].dropna().astype(str).str.title().unique().tolist()
+            if "department" in df.columns else []
+        ),
+        "dis_cols": [c for c in df.columns if "disabilities" in c.lower()],
+        "sub_cols": [c for c in df.columns if "subcategory" in c.lower()],
+    }
+
+META = dataset_meta(df)
+departments = META["departments"]
 
 # --------------------------- 5. Helper Functions ---------------------------
 def map_group(qualification):
@@ -79,75 +164,156 @@ def map_group(qualification):
         return ["Group D"]
     return []
 
-def filter_jobs(disability=None, subcategory=None,
-                qualification=None, department=None, activities=None):
-
-    df_filtered = df.copy()
-
-    # -------- Disability --------
-    if disability:
-        d = disability.lower()
-        mask = pd.Series(False, index=df_filtered.index)
-        for col in df_filtered.columns:
-            if "disabilities" in col.lower():
-                mask |= df_filtered[col].astype(str).str.lower().str.contains(d, na=False)
-        if mask.any():
-            df_filtered = df_filtered[mask]
-
-    # -------- Subcategory --------
-    if subcategory:
-        s = subcategory.lower()
-        mask = pd.Series(False, index=df_filtered.index)
-        for col in df_filtered.columns:
-            if "subcategory" in col.lower():
-                mask |= df_filtered[col].astype(str).str.lower().str.contains(s, na=False)
-        if mask.any():
-            df_filtered = df_filtered[mask]
-
-    # -------- Qualification Group --------
-    allowed_groups = map_group(qualification)
-    if allowed_groups and "group" in df_filtered.columns:
-        mask = df_filtered["group"].astype(str).isin(allowed_groups)
-        if mask.any():
-            df_filtered = df_filtered[mask]
-
-    # -------- Department --------
-    if department and "department" in df_filtered.columns:
-        mask = df_filtered["department"].astype(str).str.lower().str.contains(
-            department.lower(), na=False
-        )
-        if mask.any():
-            df_filtered = df_filtered[mask]
-
-    # -------- Functional Activities --------
-    if activities and "functional_requirements" in df_filtered.columns:
-        df_filtered["functional_norm"] = (
-            df_filtered["functional_requirements"]
-            .astype(str)
-            .str.upper()
-            .str.replace(r"[^A-Z ]", "", regex=True)
-        )
-
-        selected = [a.split()[0].upper() for a in activities]
-
-        mask = df_filtered["functional_norm"].apply(
-            lambda x: any(a in x for a in selected)
-        )
-
-        if mask.any():
-            df_filtered = df_filtered[mask]
-
-    return df_filtered.reset_index(drop=True)
+# Partial results are capped to the best-scoring rows so a weak query
+# cannot dump (and PDF) the whole dataset.
+MAX_PARTIAL = 50
+
+# Built once per dataset: the returned function closes over the DataFrame
+# and its resolved columns, so each query only does the mask work.
+@st.cache_resource(show_spinner=False)
+def make_filter(df):
+    meta = dataset_meta(df)
+    sub_cols = meta["sub_cols"]
+    has_disability = "_disability_text" in df.columns
+    has_group = "_group_norm" in df.columns
+    has_department = "_dept_lower" in df.columns
+    dept_categories = set(df["department"].cat.categories) if has_department else set()
+    has_activity_mask = "_act_mask" in df.columns
+
+    def filter_jobs(disability=None, subcategory=None,
+                    qualification=None, department=None, activities=None):
+        """Return (full, partial) matches.
+
+        Each active criterion contributes one vectorized boolean mask; a
+        per-row score (how many criteria matched) splits rows into full
+        matches and partial matches sorted by score.
+        """
+        crits = []
+
+        # -------- Disability --------
+        if disability and has_disability:
+            crits.append(df["_disability_text"].str.contains(
+                disability.lower(), regex=False, na=False
+            ))
+
+        # -------- Subcategory --------
+        if subcategory and sub_cols:
+            s = subcategory.lower()
+            m = pd.Series(False, index=df.index)
+            for col in sub_cols:
+                m |= df[col].str.contains(s, case=False, regex=False, na=False)
+            crits.append(m)
+
+        # -------- Qualification Group --------
+        allowed_groups = {g.split()[-1] for g in map_group(qualification)}
+        if allowed_groups and has_group:
+            crits.append(df["_group_norm"].isin(allowed_groups))
+
+        # -------- Department --------
+        if department and has_department:
+            d = department.lower()
+            if d in dept_categories:
+                # Dropdown picks hit this path: equality on categorical
+                # codes instead of a substring scan.
+                crits.append(df["department"] == d)
+            else:
+                crits.append(df["_dept_lower"].str.contains(d, regex=False, na=False))
+
+        # -------- Functional Activities --------
+        if activities and has_activity_mask:
+            sel_bits = np.uint16(0)
+            for a in activities:
+                sel_bits |= np.uint16(ACT_BIT[a.split()[0].upper()])
+            crits.append(pd.Series(
+                (df["_act_mask"].to_numpy() & sel_bits) != 0, index=df.index
+            ))
+
+        # Drop criteria that match nothing dataset-wide (e.g. disability
+        # labels the data phrases differently, like "hard of hearing (hh)")
+        # instead of letting them veto every row — the leniency the
+        # pre-scoring filter had.
+        crits = [m for m in crits if m.any()]
+
+        if not crits:
+            return df.reset_index(drop=True), df.iloc[0:0]
+
+        score = np.zeros(len(df), dtype=np.int8)
+        for m in crits:
+            score += m.to_numpy(dtype=bool)
+
+        full_mask = score == len(crits)
+        partial_mask = (score > 0) & ~full_mask
+
+        full = df.loc[full_mask].reset_index(drop=True)
+        partial_scores = score[partial_mask]
+        order = np.argsort(-partial_scores, kind="stable")[:MAX_PARTIAL]
+        partial = df.loc[partial_mask].iloc[order].reset_index(drop=True)
+        if len(partial):
+            # Vectorized annotation of how many criteria each row matched.
+            partial["Matched"] = np.char.add(
+                partial_scores[order].astype(str), f"/{len(crits)}"
+            )
+        return full, partial
+
+    return filter_jobs
+
+filter_jobs = make_filter(df)
+
+# Repeat searches (e.g. re-clicking with unchanged widgets) come straight
+# from cache; activities arrive as a tuple so the key is hashable.
+@st.cache_data(show_spinner=False, max_entries=64)
+def run_query(disability, subcategory, qualification, department, activities):
+    return filter_jobs(disability, subcategory, qualification, department, list(activities))
+
+# Repeat searches reuse the rendered PDF instead of re-running layout.
+@st.cache_data(show_spinner=False, max_entries=32)
+def pdf_bytes(jobs_df):
+    return generate_pdf_tabulated(jobs_df).getvalue()
+
+@st.cache_data(show_spinner=False)
+def tts_bytes(message):
+    """Synthesize speech for a message once; repeats are served from cache."""
+    from gtts import gTTS
+
+    # stream() yields MP3 fragments as the TTS service returns them,
+    # avoiding the intermediate BytesIO write_to_fp would need.
+    return b"".join(gTTS(message, lang="en").stream())
+
+def speak(message):
+    # Audio is best-effort: a TTS/network failure must not take down the
+    # results display.
+    try:
+        st.audio(tts_bytes(message), format="audio/mp3")
+    except Exception:
+        pass
+
+# ---- PDF styles, built once on first use instead of per call ----
+@st.cache_resource(show_spinner=False)
+def pdf_styles():
+    from reportlab.lib import colors
+    from reportlab.lib.styles import ParagraphStyle
+
+    return {
+        "title": ParagraphStyle("title", fontSize=18, alignment=1),
+        "h2": ParagraphStyle("h2", fontSize=14, textColor=colors.darkblue),
+        "h3": ParagraphStyle("h3", fontSize=12),
+        "text": ParagraphStyle("text", fontSize=11),
+    }
 
 def generate_pdf_tabulated(jobs_df):
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A3
+    from reportlab.platypus import (
+        SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+    )
+    from xml.sax.saxutils import escape
+
     buffer = io.BytesIO()
     doc = SimpleDocTemplate(buffer, pagesize=A3)
     elements = []
 
-    title = ParagraphStyle("title", fontSize=18, alignment=1)
-    h2 = ParagraphStyle("h2", fontSize=14, textColor=colors.darkblue)
-    h3 = ParagraphStyle("h3", fontSize=12)
-    text = ParagraphStyle("text", fontSize=11)
+    styles = pdf_styles()
+    title, h2, text = styles["title"], styles["h2"], styles["text"]
 
     elements.append(Paragraph("Suyog+", title))
     elements.append(Paragraph("By DAIL NIEPMD", title))
@@ -155,33 +321,67 @@ def generate_pdf_tabulated(jobs_df):
     elements.append(Paragraph(f"Total Matches: {len(jobs_df)}", h2))
     elements.append(Spacer(1, 20))
 
-    for _, job in jobs_df.iterrows():
-        group_level = GROUP_LEVEL_MAP.get(str(job.get("group")), job.get("group", "-"))
-        department = str(job.get("department", "-")).title()
-
-        elements.append(Paragraph(f"Designation: {job.get('designation','-')}", h2))
-        elements.append(Paragraph(f"Group: {group_level}", h3))
-        elements.append(Paragraph(f"Department: {department}", h3))
-        elements.append(Spacer(1, 10))
-
-        fields = [
-            ("Qualification Required", job.get("qualification_required", "-")),
-            ("Functional Requirements", job.get("functional_requirements", "-")),
-            ("Nature of Work", job.get("nature_of_work", "-")),
-            ("Working Conditions", job.get("working_conditions", "-")),
-        ]
-
-        for k, v in fields:
-            wrapped = "<br/>".join(wrap(str(v), 100))
-            elements.append(Paragraph(f"<b>{k}:</b> {wrapped}", text))
+    # ---- Extract display columns vectorized once, then zip plain lists ----
+    def display_col(name, titlecase=False, capitalize=False):
+        if name not in jobs_df.columns:
+            return ["-"] * len(jobs_df)
+        s = jobs_df[name].astype("object").fillna("-").astype(str).str.strip()
+        if titlecase:
+            s = s.str.title()
+        if capitalize:
+            s = s.str.slice(0, 1).str.upper() + s.str.slice(1)
+        return s.tolist()
+
+    rows = zip(
+        display_col("designation", capitalize=True),
+        # Canonical letter so GROUP_LEVEL_MAP resolves, matching the UI table.
+        display_col("_group_norm"),
+        display_col("department", titlecase=True),
+        display_col("qualification_required", capitalize=True),
+        display_col("functional_requirements", capitalize=True),
+        display_col("nature_of_work", capitalize=True),
+        display_col("working_conditions", capitalize=True),
+    )
 
-        elements.append(Spacer(1, 25))
+    # One Table flowable for all jobs: one layout pass instead of seven
+    # Paragraph/Spacer flowables per row. Cells stay Paragraphs so long
+    # text wraps.
+    header = [
+        "Designation", "Group", "Department", "Qualification",
+        "Functional Requirements", "Nature of Work", "Working Conditions",
+    ]
+    data = [[Paragraph(f"<b>{h}</b>", text) for h in header]]
+
+    for desig, group, dept, qual, func, nature, cond in rows:
+        group_level = GROUP_LEVEL_MAP.get(group, group)
+        data.append([
+            Paragraph(escape(str(v)), text)
+            for v in (desig, group_level, dept, qual, func, nature, cond)
+        ])
+
+    # splitInRow lets a too-tall row break across pages; without it long
+    # cells raise a LayoutError once a row exceeds the A3 frame.
+    table = Table(data, repeatRows=1, splitInRow=1)
+    table.setStyle(TableStyle([
+        ("GRID", (0, 0), (-1, -1), 0.25, colors.grey),
+        ("BACKGROUND", (0, 0), (-1, 0), colors.lightblue),
+        ("VALIGN", (0, 0), (-1, -1), "TOP"),
+    ]))
+    elements.append(table)
 
     doc.build(elements)
     buffer.seek(0)
     return buffer
 
 # --------------------------- 6. Streamlit UI ---------------------------
+# Fixed projection for the results table: helper columns stay out of the
+# browser payload and the column copy happens once per render.
+DISPLAY_COLS = (
+    "designation", "Group (Level)", "Department",
+    "functional_requirements", "nature_of_work", "working_conditions",
+    "Matched",
+)
+
 st.title("Suyog+ Job Finder")
 st.markdown("Find suitable jobs for persons with disabilities in India.")
 
@@ -197,24 +397,45 @@ department = st.selectbox("Select department:", departments) if departments else
 
 selected_activities = st.multiselect("Select functional activities:", activities)
 
+activity_text = st.text_input("Or type activity codes (e.g. S, RW, MF):")
+
+# ---- Merge typed codes with the multiselect (deduplicated, order kept) ----
+tokens = np.char.upper(np.array(activity_text.replace(",", " ").split(), dtype=str))
+typed_activities = [TOKEN2ACT[t] for t in tokens[np.isin(tokens, TOKEN_CODES)]]
+combined_activities = list(dict.fromkeys(selected_activities + typed_activities))
+
 if st.button("Find Jobs"):
-    results = filter_jobs(
-        disability, subcategory, qualification, department, selected_activities
+    st.session_state["results"] = run_query(
+        disability, subcategory, qualification, department, tuple(combined_activities)
     )
 
+# Results persist in session_state so widgets below (PDF toggle) can
+# rerun the script without losing the search.
+if "results" in st.session_state:
+    full, partial = st.session_state["results"]
+    results = full if not full.empty else partial
+
     if results.empty:
         st.warning("😞 Sorry, no jobs matched your profile.")
+        speak("Sorry, no jobs matched your profile.")
     else:
-        results["Group (Level)"] = results["group"].map(GROUP_LEVEL_MAP)
+        results["Group (Level)"] = results["_group_norm"].map(GROUP_LEVEL_MAP)
         results["Department"] = results["department"].astype(str).str.title()
 
-        st.success(f"✅ {len(results)} job(s) matched your profile.")
-        st.dataframe(results)
-
-        pdf = generate_pdf_tabulated(results)
-        st.download_button(
-            "Download PDF of Jobs",
-            data=pdf,
-            file_name="job_matches.pdf",
-            mime="application/pdf"
-        )
+        if full.empty:
+            st.info(f"ℹ️ No exact matches — showing {len(results)} partial match(es).")
+            speak(f"No exact matches. {len(results)} jobs matched part of your profile.")
+        else:
+            st.success(f"✅ {len(results)} job(s) matched your profile.")
+            speak(f"{len(results)} jobs matched your profile.")
+        st.dataframe(results[[c for c in DISPLAY_COLS if c in results.columns]])
+
+        # The PDF is only rendered once the user asks for it, keeping
+        # ReportLab off the search path.
+        if st.checkbox("Prepare PDF of jobs"):
+            st.download_button(
+                "Download PDF of Jobs",
+                data=pdf_bytes(results),
+                file_name="job_matches.pdf",
+                mime="application/pdf"
+            )